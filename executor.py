@@ -1,6 +1,10 @@
+import hashlib
+import io
 import json
 import os
 import subprocess
+import wave
+from collections import OrderedDict
 import webbrowser
 import pyautogui
 import keyboard
@@ -16,15 +20,256 @@ load_dotenv()
 # Инициализация клиента OpenAI
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# Фиксированные фразы ассистента, которые заранее синтезируются в аудио при запуске
+CACHED_PHRASES = [
+    "Голосовой ассистент готов к работе",
+    "Команда не распознана",
+    "Команда успешно добавлена",
+    "Ошибка при добавлении команды",
+    "Режим обучения активирован. Скажите команду, которую нужно запомнить.",
+    "Записал триггер команды. Теперь скажите действие.",
+    "Режим диктовки активирован. Говорите текст для ввода. Скажите 'стоп диктовку' для выхода.",
+    "Режим диктовки выключен",
+    "После команды 'напечатай' нужно указать текст",
+    "Произошла ошибка при обращении к ИИ",
+    "Завершаю работу. До свидания!",
+]
+
+
+class PhraseCache:
+    """
+    Кэш заранее синтезированных фраз.
+
+    Фразы хранятся в памяти (LRU) и на диске в виде WAV-файлов, ключ кэша -
+    текст, голос и скорость речи. Повторяющиеся фразы синтезируются в файл один раз,
+    после чего воспроизводятся напрямую, минуя pyttsx3.
+    """
+
+    # Файл-отметка в каталоге кэша: pyttsx3 на этой системе не сохраняет WAV
+    UNSUPPORTED_MARKER = ".unsupported"
+
+    def __init__(self, tts_engine, cache_dir="tts_cache", max_memory_items=32,
+                 max_disk_items=200, repeat_threshold=2, max_text_length=200,
+                 max_tracked_phrases=256):
+        """
+        Инициализация кэша фраз.
+
+        Args:
+            tts_engine: Движок pyttsx3, используемый для синтеза
+            cache_dir (str): Каталог для хранения синтезированных фраз
+            max_memory_items (int): Максимальное количество фраз в памяти
+            max_disk_items (int): Максимальное количество файлов в каталоге кэша (не считая фиксированных фраз)
+            repeat_threshold (int): Сколько раз фраза должна прозвучать, чтобы попасть в кэш
+            max_text_length (int): Фразы длиннее этого значения не кэшируются (например, ответы GPT)
+            max_tracked_phrases (int): Сколько еще не закэшированных фраз отслеживать для подсчета повторов
+        """
+        self.tts_engine = tts_engine
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.repeat_threshold = repeat_threshold
+        self.max_text_length = max_text_length
+        self.max_tracked_phrases = max_tracked_phrases
+        self.memory = OrderedDict()
+        self.repeat_counts = OrderedDict()
+        # Фразы, которые pyttsx3 не смог сохранить в файл: они всегда озвучиваются напрямую
+        self.unrenderable = set()
+        # Фиксированные фразы из warm_up не удаляются при очистке диска
+        self.pinned = set()
+        self.audio = None
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Если раньше pyttsx3 уже сохранил не WAV, кэш на этой системе не используется
+        self.enabled = not os.path.exists(os.path.join(cache_dir, self.UNSUPPORTED_MARKER))
+        if self.enabled:
+            # Импорт здесь, чтобы без PyAudio исполнитель команд работал через pyttsx3
+            import pyaudio
+            self.audio = pyaudio.PyAudio()
+
+    def _key(self, text):
+        """Ключ кэша: хэш текста, текущего голоса и скорости речи."""
+        voice = self.tts_engine.getProperty('voice')
+        rate = self.tts_engine.getProperty('rate')
+        return hashlib.sha1(f"{voice}|{rate}|{text}".encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def warm_up(self, phrases):
+        """
+        Синтез и загрузка в память фиксированных фраз при запуске.
+
+        Args:
+            phrases (list): Список фраз для предварительного синтеза
+        """
+        if not self.enabled:
+            return
+        for text in phrases:
+            if not self.enabled:
+                # Первая же фраза оказалась не в формате WAV: остальные не синтезируем
+                return
+            key = self._key(text)
+            self.pinned.add(key)
+            if not os.path.exists(self._path(key)):
+                self._render(text, key)
+            self._load(key)
+        self._evict_disk()
+        print(f"Кэш фраз готов: {len(self.memory)} фраз в памяти")
+
+    def play(self, text):
+        """
+        Воспроизведение фразы из кэша.
+
+        Args:
+            text (str): Текст фразы
+
+        Returns:
+            bool: True, если фраза воспроизведена из кэша; False, если ее нужно синтезировать
+        """
+        if not self.enabled or len(text) > self.max_text_length:
+            return False
+
+        key = self._key(text)
+        if key in self.unrenderable:
+            return False
+        data = self._load(key)
+        if data is None:
+            # Фраза еще не в кэше: считаем повторы и синтезируем в файл после порогового числа
+            count = self.repeat_counts.pop(key, 0) + 1
+            if count < self.repeat_threshold:
+                self.repeat_counts[key] = count
+                if len(self.repeat_counts) > self.max_tracked_phrases:
+                    self.repeat_counts.popitem(last=False)
+                return False
+            if not self._render(text, key):
+                self.unrenderable.add(key)
+                return False
+            self._evict_disk()
+            data = self._load(key)
+            if data is None:
+                return False
+
+        try:
+            self._play_wav(data)
+            return True
+        except Exception as e:
+            print(f"Ошибка воспроизведения фразы из кэша: {e}")
+            self.memory.pop(key, None)
+            return False
+
+    def _render(self, text, key):
+        """Синтез фразы в WAV-файл с помощью pyttsx3."""
+        try:
+            self.tts_engine.save_to_file(text, self._path(key))
+            self.tts_engine.runAndWait()
+            return os.path.exists(self._path(key))
+        except Exception as e:
+            print(f"Ошибка синтеза фразы в файл: {e}")
+            return False
+
+    def _load(self, key):
+        """Получение аудиоданных фразы из памяти или с диска."""
+        path = self._path(key)
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self._touch(path)
+            return self.memory[key]
+
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+            # Проверяем, что файл действительно в формате WAV
+            # (например, pyttsx3 на macOS сохраняет AIFF независимо от расширения)
+            with wave.open(io.BytesIO(data)):
+                pass
+        except Exception as e:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._disable(f"Некорректный файл кэша {path}: {e}")
+            return None
+
+        self._touch(path)
+        self.memory[key] = data
+        if len(self.memory) > self.max_memory_items:
+            self.memory.popitem(last=False)
+        return data
+
+    def _disable(self, reason):
+        """
+        Отключение кэша: на этой системе pyttsx3 не сохраняет WAV.
+
+        Отметка в каталоге кэша сохраняется между запусками, чтобы не синтезировать
+        фиксированные фразы при каждом старте впустую.
+        """
+        print(f"{reason}. Кэш фраз отключен, фразы будут синтезироваться через pyttsx3")
+        self.enabled = False
+        self.memory.clear()
+        self.repeat_counts.clear()
+        try:
+            with open(os.path.join(self.cache_dir, self.UNSUPPORTED_MARKER), 'w', encoding='utf-8') as file:
+                file.write(reason)
+        except OSError as e:
+            print(f"Предупреждение: Не удалось сохранить отметку кэша: {e}")
+
+    def close(self):
+        """Освобождение ресурсов PyAudio."""
+        if self.audio is not None:
+            self.audio.terminate()
+            self.audio = None
+
+    def _touch(self, path):
+        """Обновление времени использования файла для очистки диска по LRU."""
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        """Удаление давно не использовавшихся файлов, если их больше max_disk_items."""
+        pinned_files = {f"{key}.wav" for key in self.pinned}
+        files = [
+            os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+            if name.endswith('.wav') and name not in pinned_files
+        ]
+        if len(files) <= self.max_disk_items:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_items]:
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Предупреждение: Не удалось удалить файл кэша: {e}")
+
+    def _play_wav(self, data):
+        """Воспроизведение WAV-данных через PyAudio."""
+        with wave.open(io.BytesIO(data)) as wav:
+            stream = self.audio.open(
+                format=self.audio.get_format_from_width(wav.getsampwidth()),
+                channels=wav.getnchannels(),
+                rate=wav.getframerate(),
+                output=True
+            )
+            try:
+                stream.write(wav.readframes(wav.getnframes()))
+            finally:
+                stream.stop_stream()
+                stream.close()
+
+
 class CommandExecutor:
     """Класс для исполнения голосовых команд и взаимодействия с GPT."""
     
-    def __init__(self, config_file="config.json"):
+    def __init__(self, config_file="config.json", use_phrase_cache=True):
         """
         Инициализация исполнителя команд.
         
         Args:
             config_file (str): Путь к файлу конфигурации с командами
+            use_phrase_cache (bool): Воспроизводить повторяющиеся фразы из кэша синтезированного аудио
         """
         self.commands = self._load_commands(config_file)
         self.config_file = config_file
@@ -39,6 +284,14 @@ class CommandExecutor:
                 self.tts_engine.setProperty('voice', voice.id)
                 break
         
+        # Кэш синтезированных фраз (при ошибке инициализации используется только pyttsx3)
+        self.phrase_cache = None
+        if use_phrase_cache:
+            try:
+                self.phrase_cache = PhraseCache(self.tts_engine)
+            except Exception as e:
+                print(f"Ошибка инициализации кэша фраз: {e}")
+        
         # Ключевые слова для активации GPT
         self.gpt_triggers = ["спроси у gpt", "помощник", "спроси у жпт"]
     
@@ -294,9 +547,25 @@ class CommandExecutor:
         Args:
             text (str): Текст для озвучивания
         """
+        if self.phrase_cache is not None and self.phrase_cache.play(text):
+            return
         self.tts_engine.say(text)
         self.tts_engine.runAndWait()
     
+    def warm_up_speech(self):
+        """Предварительный синтез фиксированных фраз ассистента."""
+        if self.phrase_cache is None:
+            return
+        try:
+            self.phrase_cache.warm_up(CACHED_PHRASES)
+        except Exception as e:
+            print(f"Ошибка подготовки кэша фраз: {e}")
+    
+    def close(self):
+        """Освобождение ресурсов синтеза и воспроизведения речи."""
+        if self.phrase_cache is not None:
+            self.phrase_cache.close()
+    
     def add_new_command(self, trigger, action):
         """
         Добавление новой команды в конфигурацию.
@@ -41,16 +41,22 @@ PUNCTUATION_MAP = {
 class VoiceAssistant:
     """Основной класс голосового ассистента."""
     
-    def __init__(self, use_whisper=False, whisper_model="base"):
+    def __init__(self, use_whisper=False, whisper_model="base", recognizer=None, executor=None):
         """
         Инициализация голосового ассистента.
         
         Args:
             use_whisper (bool): Использовать faster-whisper вместо Google Speech Recognition
             whisper_model (str): Размер модели faster-whisper
+            recognizer: Готовый распознаватель речи (по умолчанию создается SpeechRecognizer)
+            executor: Готовый исполнитель команд (по умолчанию создается CommandExecutor)
         """
-        self.recognizer = SpeechRecognizer(use_whisper=use_whisper, whisper_model=whisper_model)
-        self.executor = CommandExecutor()
+        if recognizer is None:
+            recognizer = SpeechRecognizer(use_whisper=use_whisper, whisper_model=whisper_model)
+        if executor is None:
+            executor = CommandExecutor()
+        self.recognizer = recognizer
+        self.executor = executor
         self.running = False
         self.learning_mode = False
         self.dictation_mode = False
@@ -66,6 +72,9 @@ class VoiceAssistant:
         self.running = True
         print("Голосовой ассистент запущен. Нажмите Ctrl+C для выхода.")
         
+        # Заранее синтезируем фиксированные фразы, чтобы воспроизводить их без задержки
+        self.executor.warm_up_speech()
+        
         self.executor.speak("Голосовой ассистент готов к работе")
         
         while self.running:
@@ -74,22 +83,7 @@ class VoiceAssistant:
                 command = self.recognizer.listen(timeout=5, phrase_time_limit=10)
                 
                 if command:
-                    if self.learning_mode:
-                        self._handle_learning_mode(command)
-                    elif self.dictation_mode:
-                        self._handle_dictation_mode(command)
-                    elif "режим обучения" in command:
-                        self._enter_learning_mode()
-                    elif "режим диктовки" in command:
-                        self._enter_dictation_mode()
-                    elif command.lower() in ["стоп", "выход", "завершить"]:
-                        self._shutdown()
-                    else:
-                        # Обработка обычной команды
-                        result = self.executor.process_command(command)
-                        
-                        if not result:
-                            print("Команда не распознана или не выполнена")
+                    self.handle_command(command)
                 
                 # Небольшая пауза для снижения нагрузки на CPU
                 time.sleep(0.1)
@@ -97,6 +91,30 @@ class VoiceAssistant:
             except Exception as e:
                 print(f"Ошибка в основном цикле: {e}")
     
+    def handle_command(self, command):
+        """
+        Обработка одной распознанной фразы с учетом текущего режима.
+        
+        Args:
+            command (str): Распознанная голосовая команда
+        """
+        if self.learning_mode:
+            self._handle_learning_mode(command)
+        elif self.dictation_mode:
+            self._handle_dictation_mode(command)
+        elif "режим обучения" in command:
+            self._enter_learning_mode()
+        elif "режим диктовки" in command:
+            self._enter_dictation_mode()
+        elif command.lower() in ["стоп", "выход", "завершить"]:
+            self._shutdown()
+        else:
+            # Обработка обычной команды
+            result = self.executor.process_command(command)
+            
+            if not result:
+                print("Команда не распознана или не выполнена")
+    
     def _enter_learning_mode(self):
         """Вход в режим обучения для добавления новых команд."""
         self.learning_mode = True
@@ -197,6 +215,7 @@ class VoiceAssistant:
         """Обработчик сигнала для корректного завершения программы."""
         print("\nЗавершение работы голосового ассистента...")
         self.running = False
+        self.executor.close()
         sys.exit(0)
 
     def _shutdown(self):
@@ -205,6 +224,7 @@ class VoiceAssistant:
         self.executor.speak("Завершаю работу. До свидания!")
         time.sleep(1)  # Даем время для произнесения фразы
         self.running = False
+        self.executor.close()
         sys.exit(0)
 
 
@@ -1,6 +1,3 @@
-import os
-import tempfile
-import time
 import speech_recognition as sr
 from faster_whisper import WhisperModel
 import numpy as np
@@ -11,10 +8,254 @@ import warnings
 warnings.filterwarnings("ignore", category=DeprecationWarning)
 warnings.filterwarnings("ignore", category=UserWarning)
 
+class AudioPreprocessor:
+    """
+    Векторизованная предобработка аудио перед распознаванием faster-whisper.
+
+    Приводит запись к 16 кГц моно, обрезает тишину в начале и в конце,
+    сокращает длинные паузы внутри фразы и нормализует уровень сигнала.
+    Все промежуточные данные хранятся в заранее выделенных буферах, которые
+    переиспользуются между фразами (и расширяются только для более длинных записей).
+    """
+
+    TARGET_RATE = 16000
+    # Частота среза фильтра защиты от наложения спектров (ниже частоты Найквиста 8 кГц)
+    LOWPASS_CUTOFF = 7000
+
+    def __init__(self, frame_ms=30, silence_threshold=0.002, relative_threshold=0.02,
+                 max_pause=0.4, padding=0.2, target_peak=0.9, max_gain=10.0,
+                 max_duration=10, max_input_rate=48000):
+        """
+        Инициализация предобработчика.
+
+        Args:
+            frame_ms (int): Длина кадра для оценки энергии в миллисекундах
+            silence_threshold (float): Абсолютный порог RMS, ниже которого кадр считается тишиной,
+                если порог распознавателя не передан в process()
+            relative_threshold (float): Порог тишины относительно самого громкого кадра
+                (0.02 - около -34 дБ, чтобы не срезать глухие согласные в начале слова)
+            max_pause (float): Максимальная длительность паузы внутри фразы в секундах
+            padding (float): Запас тишины, оставляемый вокруг речи, в секундах
+            target_peak (float): Пиковый уровень после нормализации
+            max_gain (float): Максимальное усиление при нормализации
+            max_duration (int): Длительность записи в секундах, под которую выделяются буферы
+                (по умолчанию равна phrase_time_limit в main.py; для более длинных записей буферы расширяются)
+            max_input_rate (int): Частота дискретизации, под которую выделяются буферы
+        """
+        self.frame_len = self.TARGET_RATE * frame_ms // 1000
+        self.silence_threshold = silence_threshold
+        self.relative_threshold = relative_threshold
+        self.max_pause_frames = max(1, int(max_pause * self.TARGET_RATE) // self.frame_len)
+        self.padding_frames = int(padding * self.TARGET_RATE) // self.frame_len
+        self.target_peak = target_peak
+        self.max_gain = max_gain
+        self.removed_seconds = 0.0
+        self._lowpass_taps = {}
+
+        self._input_capacity = 0
+        self._output_capacity = 0
+        self._allocate(max_duration * max_input_rate, max_duration * self.TARGET_RATE)
+
+    def _allocate(self, input_samples, output_samples):
+        """Выделение (или расширение) рабочих буферов."""
+        if input_samples > self._input_capacity:
+            self._input_capacity = input_samples
+            self._samples = np.empty(input_samples, dtype=np.float32)
+            self._filtered = np.empty(input_samples, dtype=np.float32)
+            self._filter_scratch = np.empty(input_samples, dtype=np.float32)
+        if output_samples > self._output_capacity:
+            self._output_capacity = output_samples
+            self._arange = np.arange(output_samples, dtype=np.float64)
+            self._positions = np.empty(output_samples, dtype=np.float64)
+            self._fractions = np.empty(output_samples, dtype=np.float64)
+            self._indices = np.empty(output_samples, dtype=np.intp)
+            self._weights = np.empty(output_samples, dtype=np.float32)
+            self._resampled = np.empty(output_samples, dtype=np.float32)
+            self._scratch = np.empty(output_samples, dtype=np.float32)
+            self._output = np.empty(output_samples, dtype=np.float32)
+            frames = output_samples // self.frame_len + 1
+            self._energy = np.empty(frames, dtype=np.float32)
+            self._voiced = np.empty(frames, dtype=bool)
+            self._keep = np.empty(frames, dtype=bool)
+
+    def process(self, raw_data, sample_rate, channels=1, energy_threshold=None):
+        """
+        Предобработка сырых 16-битных PCM-данных.
+
+        Args:
+            raw_data (bytes): Аудиоданные в формате signed 16-bit little-endian
+            sample_rate (int): Частота дискретизации записи
+            channels (int): Количество каналов (чередующиеся сэмплы)
+            energy_threshold (float): Текущий порог энергии sr.Recognizer (RMS в единицах int16);
+                абсолютный порог тишины берется как половина этого значения
+
+        Returns:
+            numpy.ndarray: Аудио 16 кГц float32; это представление внутреннего буфера,
+                действительное до следующего вызова process(). Если ни один кадр не превысил
+                порог, возвращается запись без обрезки; пустой массив - только для записи короче кадра.
+        """
+        pcm = np.frombuffer(raw_data, dtype=np.int16)
+        n_in = len(pcm) // channels
+        duration = n_in / sample_rate
+        n_out = int(n_in * self.TARGET_RATE / sample_rate)
+        n_frames = n_out // self.frame_len
+        if n_frames == 0:
+            self.removed_seconds = duration
+            return self._output[:0]
+        self._allocate(n_in, n_out)
+
+        samples = self._samples[:n_in]
+        if channels > 1:
+            # Сведение в моно: среднее по каналам
+            pcm = pcm[:n_in * channels].reshape(n_in, channels)
+            np.mean(pcm, axis=1, dtype=np.float32, out=samples)
+            samples *= 1.0 / 32768.0
+        else:
+            np.multiply(pcm, np.float32(1.0 / 32768.0), out=samples)
+
+        audio = self._resample(samples, sample_rate, n_out)
+
+        # Энергия по кадрам фиксированной длины
+        frames = audio[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        squares = self._scratch[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        np.square(frames, out=squares)
+        energy = self._energy[:n_frames]
+        np.mean(squares, axis=1, out=energy)
+        np.sqrt(energy, out=energy)
+
+        if energy_threshold is not None:
+            # Порог распознавателя уже подстроен под шум помещения в listen()
+            floor = energy_threshold / 32768.0 / 2
+        else:
+            floor = self.silence_threshold
+        threshold = max(floor, float(energy.max()) * self.relative_threshold)
+        voiced = self._voiced[:n_frames]
+        np.greater(energy, threshold, out=voiced)
+
+        keep = self._select_frames(voiced)
+        n_keep = int(np.count_nonzero(keep))
+        if n_keep == 0:
+            # sr.Recognizer уже принял эту запись как фразу: не выбрасываем ее, а передаем без обрезки
+            result = audio[:n_out]
+        else:
+            result = self._output[:n_keep * self.frame_len]
+            np.take(frames, np.flatnonzero(keep), axis=0, out=result.reshape(n_keep, self.frame_len), mode="clip")
+        n_result = len(result)
+
+        # Нормализация по пиковому уровню с ограничением усиления
+        peak = max(float(result.max()), -float(result.min()))
+        if peak > 0:
+            result *= np.float32(min(self.target_peak / peak, self.max_gain))
+
+        self.removed_seconds = duration - n_result / self.TARGET_RATE
+        return result
+
+    def _get_lowpass_taps(self, sample_rate):
+        """
+        Коэффициенты КИХ-фильтра нижних частот (оконный sinc с окном Блэкмана).
+
+        Длина фильтра растет с частотой дискретизации, чтобы ширина переходной
+        полосы оставалась около 2.5 кГц. Коэффициенты кэшируются по частоте.
+        """
+        taps = self._lowpass_taps.get(sample_rate)
+        if taps is None:
+            num_taps = (sample_rate // 480) | 1
+            cutoff = self.LOWPASS_CUTOFF / sample_rate
+            n = np.arange(num_taps) - num_taps // 2
+            taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(num_taps)
+            taps = (taps / taps.sum()).astype(np.float32)
+            self._lowpass_taps[sample_rate] = taps
+        return taps
+
+    def _lowpass(self, samples, sample_rate):
+        """
+        Фильтрация перед понижением частоты дискретизации.
+
+        Свертка выполняется сдвигами по коэффициентам с записью в заранее
+        выделенные буферы, без промежуточных массивов размером с запись.
+        """
+        n_in = len(samples)
+        taps = self._get_lowpass_taps(sample_rate)
+        half = len(taps) // 2
+        filtered = self._filtered[:n_in]
+        scratch = self._filter_scratch
+        filtered.fill(0)
+
+        # Фильтр симметричный, поэтому filtered[i] = sum(taps[k] * samples[i + k - half])
+        for k, tap in enumerate(taps):
+            shift = k - half
+            if abs(shift) >= n_in:
+                continue
+            if shift >= 0:
+                source, target = samples[shift:], filtered[:n_in - shift]
+            else:
+                source, target = samples[:n_in + shift], filtered[-shift:]
+            product = scratch[:len(source)]
+            np.multiply(source, tap, out=product)
+            target += product
+        return filtered
+
+    def _resample(self, samples, sample_rate, n_out):
+        """Фильтрация и линейная интерполяция к целевой частоте дискретизации."""
+        if sample_rate == self.TARGET_RATE:
+            return samples[:n_out]
+        if sample_rate > self.TARGET_RATE:
+            # Без фильтра частоты выше 8 кГц отразятся в полосу речи
+            samples = self._lowpass(samples, sample_rate)
+
+        positions = self._positions[:n_out]
+        fractions = self._fractions[:n_out]
+        indices = self._indices[:n_out]
+        weights = self._weights[:n_out]
+        resampled = self._resampled[:n_out]
+        right = self._scratch[:n_out]
+
+        # Позиция каждого выходного сэмпла во входном сигнале: целая часть и доля
+        np.multiply(self._arange[:n_out], sample_rate / self.TARGET_RATE, out=positions)
+        np.modf(positions, out=(fractions, positions))
+        indices[:] = positions
+        np.minimum(indices, len(samples) - 2, out=indices)
+        weights[:] = fractions
+
+        # mode="clip" позволяет numpy писать сразу в out без промежуточной копии
+        np.take(samples, indices, out=resampled, mode="clip")
+        indices += 1
+        np.take(samples, indices, out=right, mode="clip")
+        right -= resampled
+        right *= weights
+        resampled += right
+        return resampled
+
+    def _select_frames(self, voiced):
+        """
+        Выбор кадров для сохранения: речь, небольшой запас вокруг нее
+        и не более max_pause_frames кадров из каждой внутренней паузы.
+        """
+        keep = self._keep[:len(voiced)]
+        voiced_idx = np.flatnonzero(voiced)
+        keep[:] = False
+        if len(voiced_idx) == 0:
+            return keep
+
+        start = max(voiced_idx[0] - self.padding_frames, 0)
+        end = min(voiced_idx[-1] + self.padding_frames + 1, len(voiced))
+        keep[start:end] = True
+
+        # Длинные паузы между соседними фрагментами речи сокращаем до max_pause_frames
+        gaps = np.diff(voiced_idx) - 1
+        long_gaps = np.flatnonzero(gaps > self.max_pause_frames)
+        half = self.max_pause_frames // 2
+        for gap in long_gaps:
+            gap_start = voiced_idx[gap] + 1 + half
+            gap_end = voiced_idx[gap + 1] - (self.max_pause_frames - half)
+            keep[gap_start:gap_end] = False
+        return keep
+
+
 class SpeechRecognizer:
     """Класс для распознавания речи с использованием различных моделей."""
     
-    def __init__(self, use_whisper=True, whisper_model="base", language="ru"):
+    def __init__(self, use_whisper=True, whisper_model="base", language="ru", preprocess=True):
         """
         Инициализация распознавателя речи.
         
@@ -22,10 +263,13 @@ class SpeechRecognizer:
             use_whisper (bool): Использовать faster-whisper вместо Google Speech Recognition
             whisper_model (str): Размер модели faster-whisper ("tiny", "base", "small", "medium", "large")
             language (str): Язык распознавания (для faster-whisper и Google Speech)
+            preprocess (bool): Предобрабатывать аудио (16 кГц, обрезка тишины, нормализация) перед faster-whisper
         """
         self.recognizer = sr.Recognizer()
         self.use_whisper = use_whisper
         self.language = language
+        # Предобработчик нужен только faster-whisper и создается после загрузки модели
+        self.preprocessor = None
         
         # Инициализация модели faster-whisper, если она выбрана
         if use_whisper:
@@ -41,6 +285,9 @@ class SpeechRecognizer:
                     compute_type=compute_type
                 )
                 print(f"Модель faster-whisper '{whisper_model}' загружена на устройстве {device} с типом {compute_type}")
+                
+                if preprocess:
+                    self.preprocessor = AudioPreprocessor()
             except Exception as e:
                 print(f"Ошибка загрузки модели faster-whisper: {e}")
                 print("Переключение на Google Speech Recognition")
@@ -103,22 +350,25 @@ class SpeechRecognizer:
     def _recognize_with_faster_whisper(self, audio):
         """Распознавание с помощью локальной модели faster-whisper."""
         try:
-            # Создаем уникальное имя для временного файла
-            temp_dir = tempfile.gettempdir()
-            temp_filename = os.path.join(temp_dir, f"whisper_audio_{int(time.time())}_{os.getpid()}.wav")
-            
-            # Сохраняем аудио во временный файл
-            with open(temp_filename, 'wb') as temp_audio:
-                temp_audio.write(audio.get_wav_data())
-            
-            # Проверяем, существует ли файл
-            if not os.path.exists(temp_filename):
-                raise FileNotFoundError(f"Временный файл не был создан: {temp_filename}")
+            if self.preprocessor is not None:
+                # Предобработка: 16 кГц моно, без тишины, с нормализованным уровнем
+                samples = self.preprocessor.process(
+                    audio.get_raw_data(convert_width=2),
+                    audio.sample_rate,
+                    energy_threshold=self.recognizer.energy_threshold
+                )
+                print(f"Предобработка: удалено {self.preprocessor.removed_seconds:.2f} с тишины")
+                if len(samples) == 0:
+                    print("Речь не обнаружена")
+                    return None
+            else:
+                # Без предобработки передаем запись как есть, приводя ее к 16 кГц
+                raw = audio.get_raw_data(convert_rate=AudioPreprocessor.TARGET_RATE, convert_width=2)
+                samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768.0
             
             # Распознаем с помощью faster-whisper
-            # Новый API для faster-whisper
             segments, info = self.whisper_model.transcribe(
-                temp_filename,
+                samples,
                 language=self.language,
                 beam_size=5,
                 word_timestamps=False
@@ -127,12 +377,6 @@ class SpeechRecognizer:
             # Собираем текст из всех сегментов
             text = " ".join([segment.text for segment in segments])
             
-            # Удаляем временный файл
-            try:
-                os.remove(temp_filename)
-            except Exception as e:
-                print(f"Предупреждение: Не удалось удалить временный файл: {e}")
-            
             print(f"Распознано (faster-whisper): {text}")
             return text.lower().strip()
         except Exception as e:
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Воспроизведение расшифровок через конечный автомат голосового ассистента.
+
+Фразы из JSONL-файла подаются в VoiceAssistant.handle_command без микрофона
+и без реальных побочных эффектов: keyboard, pyautogui, webbrowser, subprocess,
+синтез речи и GPT заменяются записывающими заглушками. Для каждой фразы
+измеряется время обработки, а записанные побочные эффекты сверяются с ожидаемыми.
+
+Формат строки расшифровки:
+    {"text": "запусти youtube", "expect": [["webbrowser.open", "https://youtube.com"]]}
+
+Поле "expect" необязательно; если оно указано, список записанных событий
+для фразы должен совпадать с ним полностью. Событие - это имя вызова и его
+позиционные аргументы; если вызов был с именованными аргументами, они
+добавляются последним элементом в виде словаря:
+    ["subprocess.Popen", ["chrome"], {"stdout": -1, "stderr": -1}]
+
+Пример запуска:
+    python replay.py replay_example.jsonl --repeat 1000
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+
+
+class SideEffectRecorder:
+    """Журнал побочных эффектов, вызванных ассистентом."""
+
+    def __init__(self):
+        self.events = []
+
+    def record(self, name, *args):
+        self.events.append([name, *args])
+
+    def take(self):
+        """Возвращает накопленные события и очищает журнал."""
+        events = self.events
+        self.events = []
+        return events
+
+
+class FakeTTSEngine:
+    """Заглушка движка pyttsx3, записывающая озвучиваемый текст."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.properties = {'voices': [], 'voice': None, 'rate': 200}
+
+    def getProperty(self, name):
+        return self.properties.get(name)
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def say(self, text):
+        self.recorder.record("tts.say", text)
+
+    def save_to_file(self, text, filename):
+        self.recorder.record("tts.save_to_file", text)
+
+    def runAndWait(self):
+        pass
+
+
+class FakeGPTClient:
+    """Заглушка клиента OpenAI, возвращающая фиксированный ответ."""
+
+    def __init__(self, recorder, answer="Ответ"):
+        self.recorder = recorder
+        self.answer = answer
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        self.recorder.record("gpt.ask", messages[-1]["content"])
+        message = types.SimpleNamespace(content=self.answer)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def _fake_module(name, recorder, functions, **attributes):
+    """Создание модуля-заглушки, записывающего вызовы указанных функций."""
+    module = types.ModuleType(name)
+    for function in functions:
+        def call(*args, _name=f"{name}.{function}", **kwargs):
+            if kwargs:
+                recorder.record(_name, *args, kwargs)
+            else:
+                recorder.record(_name, *args)
+        setattr(module, function, call)
+    for attribute, value in attributes.items():
+        setattr(module, attribute, value)
+    return module
+
+
+def install_fake_backends(recorder):
+    """
+    Подмена модулей с побочными эффектами до импорта ассистента.
+
+    Args:
+        recorder (SideEffectRecorder): Журнал для записи вызовов
+
+    Returns:
+        tuple: Модули main и executor с подключенными заглушками
+    """
+    sys.modules['keyboard'] = _fake_module(
+        'keyboard', recorder, ['write', 'press', 'release', 'press_and_release']
+    )
+    sys.modules['pyautogui'] = _fake_module('pyautogui', recorder, ['write', 'hotkey', 'press'])
+    sys.modules['pyttsx3'] = _fake_module('pyttsx3', recorder, [], init=lambda: FakeTTSEngine(recorder))
+    sys.modules['pyaudio'] = _fake_module('pyaudio', recorder, [])
+    # Клиент OpenAI создается при импорте executor и требует ключ; запросы все равно идут в заглушку
+    os.environ.setdefault("OPENAI_API_KEY", "replay")
+
+    import executor
+    import main
+
+    no_sleep = types.SimpleNamespace(sleep=lambda seconds: None)
+    executor.time = no_sleep
+    main.time = no_sleep
+    executor.webbrowser = _fake_module('webbrowser', recorder, ['open'])
+    executor.subprocess = _fake_module('subprocess', recorder, ['Popen'], PIPE=-1)
+    # Подменяем os только для executor: system записывается, остальное берется из настоящего os
+    fake_os = _fake_module('os', recorder, ['system'])
+    for attribute, value in vars(os).items():
+        if not hasattr(fake_os, attribute):
+            setattr(fake_os, attribute, value)
+    executor.os = fake_os
+    executor.client = FakeGPTClient(recorder)
+    return main, executor
+
+
+def load_transcript(path):
+    """Загрузка фраз из JSONL-файла."""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as file:
+        for line_number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            if "text" not in entry:
+                raise ValueError(f"Строка {line_number}: отсутствует поле 'text'")
+            entries.append(entry)
+    return entries
+
+
+def _percentile(sorted_values, percent):
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def reset_state(assistant, commands):
+    """
+    Возврат ассистента в исходное состояние перед очередным проходом.
+
+    Без этого команды, добавленные в режиме обучения, накапливаются между
+    повторами, и замеры отражают рост конфигурации, а не стоимость обработки.
+
+    Args:
+        assistant: Экземпляр VoiceAssistant с заглушками
+        commands (list): Исходный список команд исполнителя
+    """
+    assistant.executor.commands = list(commands)
+    assistant.learning_mode = False
+    assistant.dictation_mode = False
+    assistant.running = True
+    for attribute in ('learning_step', 'new_trigger', 'new_action'):
+        if hasattr(assistant, attribute):
+            delattr(assistant, attribute)
+
+
+def replay(assistant, recorder, entries, repeat=1, verbose=False):
+    """
+    Прогон фраз через ассистента.
+
+    Args:
+        assistant: Экземпляр VoiceAssistant с заглушками
+        recorder (SideEffectRecorder): Журнал побочных эффектов
+        entries (list): Фразы расшифровки
+        repeat (int): Сколько раз повторить расшифровку
+        verbose (bool): Не подавлять вывод ассистента
+
+    Returns:
+        tuple: Список задержек (текст, секунды) и список несовпадений с ожиданиями
+    """
+    latencies = []
+    mismatches = []
+    commands = list(assistant.executor.commands)
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            # Вывод ассистента на большом объеме искажает замеры, поэтому подавляем его
+            stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+        for iteration in range(repeat):
+            reset_state(assistant, commands)
+            for entry in entries:
+                text = entry["text"]
+                start = time.perf_counter()
+                try:
+                    assistant.handle_command(text)
+                except SystemExit as e:
+                    # Команды выхода завершают процесс; в режиме воспроизведения это просто событие
+                    recorder.record("sys.exit", e.code)
+                    assistant.running = True
+                latencies.append((text, time.perf_counter() - start))
+
+                events = recorder.take()
+                if "expect" in entry and events != entry["expect"]:
+                    mismatches.append((iteration, text, entry["expect"], events))
+
+    return latencies, mismatches
+
+
+def print_report(latencies, total_time, mismatches):
+    """Вывод статистики пропускной способности и задержек."""
+    values = sorted(latency for _, latency in latencies)
+    print(f"Обработано команд: {len(values)} за {total_time:.3f} с")
+    print(f"Пропускная способность: {len(values) / total_time:.1f} команд/с")
+    print(
+        "Задержка, мс: "
+        f"среднее {sum(values) / len(values) * 1000:.3f}, "
+        f"p50 {_percentile(values, 50) * 1000:.3f}, "
+        f"p95 {_percentile(values, 95) * 1000:.3f}, "
+        f"p99 {_percentile(values, 99) * 1000:.3f}, "
+        f"макс {values[-1] * 1000:.3f}"
+    )
+
+    # Самые медленные фразы по средней задержке
+    per_text = {}
+    for text, latency in latencies:
+        per_text.setdefault(text, []).append(latency)
+    slowest = sorted(per_text.items(), key=lambda item: sum(item[1]) / len(item[1]), reverse=True)[:5]
+    print("Самые медленные фразы:")
+    for text, samples in slowest:
+        print(f"  {sum(samples) / len(samples) * 1000:.3f} мс  {text}")
+
+    if mismatches:
+        print(f"Несовпадений с ожидаемыми побочными эффектами: {len(mismatches)}")
+        for iteration, text, expected, actual in mismatches[:10]:
+            print(f"  [{iteration}] '{text}'")
+            print(f"    ожидалось: {expected}")
+            print(f"    получено:  {actual}")
+    else:
+        print("Все побочные эффекты совпали с ожидаемыми")
+
+
+def main():
+    """Точка входа для воспроизведения расшифровок."""
+    parser = argparse.ArgumentParser(description="Воспроизведение расшифровок через голосового ассистента")
+    parser.add_argument("transcript", help="JSONL-файл с фразами")
+    parser.add_argument("--repeat", type=int, default=1, help="Сколько раз повторить расшифровку")
+    parser.add_argument("--config", default="config.json", help="Файл конфигурации команд")
+    parser.add_argument("--max-p95-ms", type=float, help="Завершиться с ошибкой, если p95 задержки выше порога")
+    parser.add_argument("--verbose", action="store_true", help="Показывать вывод ассистента")
+    args = parser.parse_args()
+
+    recorder = SideEffectRecorder()
+    assistant_module, executor_module = install_fake_backends(recorder)
+    entries = load_transcript(args.transcript)
+    if not entries:
+        print("Расшифровка пуста")
+        return 1
+
+    # Режим обучения сохраняет команды в конфигурацию, поэтому работаем с копией
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_file = os.path.join(temp_dir, "config.json")
+        shutil.copyfile(args.config, config_file)
+
+        executor = executor_module.CommandExecutor(config_file=config_file, use_phrase_cache=False)
+        # Распознаватель не нужен: фразы подаются напрямую в handle_command
+        assistant = assistant_module.VoiceAssistant(recognizer=types.SimpleNamespace(), executor=executor)
+        recorder.take()
+
+        start = time.perf_counter()
+        latencies, mismatches = replay(assistant, recorder, entries, args.repeat, args.verbose)
+        total_time = time.perf_counter() - start
+
+    print_report(latencies, total_time, mismatches)
+
+    if mismatches:
+        return 1
+    if args.max_p95_ms is not None:
+        p95 = _percentile(sorted(latency for _, latency in latencies), 95) * 1000
+        if p95 > args.max_p95_ms:
+            print(f"p95 задержки {p95:.3f} мс превышает порог {args.max_p95_ms} мс")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())